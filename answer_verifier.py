@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import shutil
+import asyncio
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
+from chapter_index import ChapterIndex
+from question_bank import Question, iter_questions, append_questions
+
+
+class AnswerVerifier:
+    SYSTEM_PROMPT = (
+        "You are a CSCS expert fact-checking multiple choice questions against textbook excerpts. "
+        "Judge only from the excerpts provided. Always return responses in valid JSON format."
+    )
+    VERIFICATION_INSTRUCTIONS = """For each question, decide whether the excerpts support the marked correct answer and its explanation.
+Return results in this exact JSON format:
+{
+    "results": [
+        {
+            "id": 1,
+            "supported": true,
+            "reason": "One sentence citing what the excerpt says"
+        }
+    ]
+}"""
+
+    def __init__(self, trivia, index: ChapterIndex, top_k: int = 3, batch_size: int = 5,
+                 max_attempts: int = 3):
+        """Check generated questions against the passages retrieved for them."""
+        self.trivia = trivia
+        self.index = index
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.metrics = trivia.metrics
+
+    def retrieve(self, question: Question) -> List[Dict[str, Any]]:
+        """Find the passages most relevant to a question's answer and explanation."""
+        query = f"{question.question} {question.correct_option} {question.explanation}"
+        hits = self.index.search(query, self.top_k, chapter=question.chapter)
+        if not hits and question.chapter is not None:
+            hits = self.index.search(query, self.top_k)
+        return [passage for _, passage in hits]
+
+    def build_verification_content(self, items: List[Tuple[Question, List[Dict[str, Any]]]]) -> str:
+        sections = []
+        for item_id, (question, passages) in enumerate(items, 1):
+            options = "\n".join(f"{letter}) {text}" for letter, text in question.option_items())
+            excerpts = "\n\n".join(
+                f"[{p['chapter']}, p. {p['page']}, {p['section']}]\n{p['text']}" for p in passages
+            ) or "(no matching excerpts found)"
+            sections.append(
+                f"Question {item_id}: {question.question}\n{options}\n"
+                f"Marked correct answer: {question.correct_answer}\n"
+                f"Explanation: {question.explanation}\n\n"
+                f"Excerpts:\n{excerpts}"
+            )
+        return "\n\n---\n\n".join(sections) + "\n\n" + self.VERIFICATION_INSTRUCTIONS
+
+    async def verify_batch(self, questions: List[Question]) -> List[Dict[str, Any]]:
+        """Verify a small group of questions with a single Claude request."""
+        items = [(question, self.retrieve(question)) for question in questions]
+        content = self.build_verification_content(items)
+
+        # A missing or garbled verdict is a formatting slip, not a judgement, so ask again
+        for attempt in range(self.max_attempts):
+            with self.metrics.span("verify_batch", questions=len(questions), attempt=attempt + 1):
+                response = await self.trivia._make_claude_request(
+                    content, system=self.SYSTEM_PROMPT, temperature=0.0
+                )
+            try:
+                return self.parse_verdicts(response, items)
+            except ValueError as e:
+                print(f"⚠️ {e}, retrying")
+                self.metrics.increment("verify_retries")
+        raise Exception(f"No usable verdicts after {self.max_attempts} attempts")
+
+    @staticmethod
+    def parse_verdicts(response, items: List[Tuple[Question, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Match Claude's results to items, raising ValueError unless every item got a verdict."""
+        try:
+            results = json.loads(response.content[0].text)["results"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            raise ValueError("Failed to parse Claude's verification response as JSON")
+        if not isinstance(results, list):
+            raise ValueError("Verification response has no results list")
+
+        by_id = {r.get("id"): r for r in results if isinstance(r, dict)}
+        verdicts = []
+        for item_id, (question, passages) in enumerate(items, 1):
+            result = by_id.get(item_id)
+            if result is None or not isinstance(result.get("supported"), bool):
+                raise ValueError(f"No verdict returned for question {item_id}")
+            verdicts.append({
+                "supported": result["supported"],
+                "reason": result.get("reason", ""),
+                "sources": [{"chapter": p["chapter"], "page": p["page"], "section": p["section"]}
+                            for p in passages],
+            })
+        return verdicts
+
+    async def verify(self, questions: Iterable[Question],
+                     max_concurrent: int = 3) -> AsyncIterator[Tuple[Question, Dict[str, Any]]]:
+        """Verify questions in batches, yielding (question, verdict) pairs in input order."""
+        batch: List[Question] = []
+        group: List[List[Question]] = []
+
+        async def run_group(group):
+            verdict_lists = await asyncio.gather(*(self.verify_batch(b) for b in group))
+            for questions_batch, verdicts in zip(group, verdict_lists):
+                for question, verdict in zip(questions_batch, verdicts):
+                    self.metrics.increment("questions_verified")
+                    if not verdict["supported"]:
+                        self.metrics.increment("questions_unsupported")
+                    yield question, verdict
+
+        for question in questions:
+            batch.append(question)
+            if len(batch) == self.batch_size:
+                group.append(batch)
+                batch = []
+            if len(group) == max_concurrent:
+                async for pair in run_group(group):
+                    yield pair
+                group = []
+        if batch:
+            group.append(batch)
+        if group:
+            async for pair in run_group(group):
+                yield pair
+
+
+async def verify_main(questions_file: str = "chapter1_questions.jsonl",
+                      rejected_file: Optional[str] = None,
+                      index_file: str = "chapter_index.json",
+                      client=None) -> bool:
+    """Drop questions whose answers the textbook does not support, before TTS.
+
+    Rejected questions are appended to rejected_file (by default next to the
+    bank, e.g. chapter1_questions.rejected.jsonl). Nothing is changed unless
+    every question gets a verdict. Returns True if at least one question passed.
+    """
+    try:
+        from trivia_questions import CSCSTrivia
+
+        if not os.path.exists(questions_file):
+            print(f"❌ Error: Questions file {questions_file} not found")
+            return False
+
+        rejected_file = rejected_file or os.path.splitext(questions_file)[0] + ".rejected.jsonl"
+        trivia = CSCSTrivia(client=client)
+        verifier = AnswerVerifier(trivia, ChapterIndex.load_or_build(index_file))
+
+        print(f"\n🔎 Verifying questions in {questions_file}...")
+        tmp_file = questions_file + ".verified"
+        tmp_rejected = rejected_file + ".new"
+        open(tmp_file, 'w').close()
+        supported = rejected = 0
+        try:
+            with open(tmp_rejected, 'w') as rejected_out:
+                async for question, verdict in verifier.verify(iter_questions(questions_file, trivia.metrics)):
+                    if verdict["supported"]:
+                        supported += append_questions(tmp_file, [question])
+                        print(f"✅ Supported: {question.question}")
+                    else:
+                        rejected += 1
+                        rejected_out.write(json.dumps({**question.to_dict(), "verification": verdict}) + "\n")
+                        print(f"❌ Unsupported: {question.question}\n   {verdict['reason']}")
+
+            # Every question has a verdict: keep the rejections, then replace the bank
+            # (even when nothing passed, so rejected questions never reach TTS)
+            with open(tmp_rejected, 'r') as new_records, open(rejected_file, 'a') as rejected_out:
+                shutil.copyfileobj(new_records, rejected_out)
+            os.replace(tmp_file, questions_file)
+        finally:
+            for path in (tmp_file, tmp_rejected):
+                if os.path.exists(path):
+                    os.remove(path)
+        print(f"\n✅ {supported} questions supported, {rejected} moved to {rejected_file}")
+        if not supported:
+            print("❌ No questions passed verification; the question bank is now empty")
+
+        trivia.metrics.print_summary()
+        trivia.metrics.export_jsonl("metrics/verify_metrics.jsonl")
+        trivia.metrics.export_prometheus("metrics/verify.prom", stage="verify")
+        return supported > 0
+
+    except Exception as e:
+        print(f"\n❌ Critical error: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(verify_main()) else 1)
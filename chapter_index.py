@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just may me might more most
+must my no nor not now of off on once only or other our out over own same she should so some such
+than that the their them then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your
+""".split())
+
+# Lines set noticeably larger than body text are treated as section headings
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_LENGTH = 100
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _page_lines(page) -> List[Tuple[str, float]]:
+    """Return (text, largest font size) for each line on a PDF page, in reading order."""
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if spans:
+                text = " ".join(s["text"].strip() for s in spans)
+                lines.append((text, max(s["size"] for s in spans)))
+    return lines
+
+
+def _body_font_size(pages_lines: List[List[Tuple[str, float]]]) -> float:
+    """The font size covering the most characters is taken as body text."""
+    sizes = Counter()
+    for lines in pages_lines:
+        for text, size in lines:
+            sizes[round(size, 1)] += len(text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def extract_passages(pdf_path: str, chapter_name: str) -> List[Dict[str, Any]]:
+    """Split a chapter PDF into passages, one per section per page."""
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    pages_lines = [_page_lines(page) for page in doc]
+    body_size = _body_font_size(pages_lines)
+
+    passages = []
+    section = chapter_name
+    for page_number, lines in enumerate(pages_lines, 1):
+        # A page starts in whichever section the previous page ended in
+        segments = [(section, [])]
+        for text, size in lines:
+            is_heading = (body_size and size >= body_size * HEADING_SIZE_RATIO
+                          and len(text) <= MAX_HEADING_LENGTH and any(c.isalpha() for c in text))
+            if is_heading:
+                section = text
+                segments.append((section, []))
+            segments[-1][1].append(text)
+
+        for segment_section, segment_lines in segments:
+            if segment_lines:
+                passages.append({
+                    "chapter": chapter_name,
+                    "section": segment_section,
+                    "page": page_number,
+                    "text": " ".join(segment_lines),
+                })
+    return passages
+
+
+class ChapterIndex:
+    def __init__(self, passages: List[Dict[str, Any]], postings: Dict[str, List[List[int]]],
+                 lengths: List[int]):
+        """Inverted index over section/page passages, scored with BM25."""
+        self.passages = passages
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def from_passages(cls, passages: List[Dict[str, Any]]) -> "ChapterIndex":
+        postings: Dict[str, List[List[int]]] = {}
+        lengths = []
+        for passage_id, passage in enumerate(passages):
+            # Section titles are indexed with the body so heading terms match too
+            tokens = tokenize(f"{passage['section']} {passage['text']}")
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, []).append([passage_id, count])
+        return cls(passages, postings, lengths)
+
+    @classmethod
+    def build(cls, chapters_folder: str = "chapters") -> "ChapterIndex":
+        """Index every chapter_N.pdf in the folder.
+
+        index.pdf is the book's back-of-book term index; its page references
+        point at the printed book, not these per-chapter PDFs, so it is not
+        indexed as content.
+        """
+        from trivia_questions import CSCSTrivia
+
+        chapter_files = sorted(
+            (f for f in os.listdir(chapters_folder) if f.startswith("chapter_") and f.endswith(".pdf")),
+            key=lambda f: int(f[len("chapter_"):-len(".pdf")])
+        )
+        passages = []
+        for filename in chapter_files:
+            chapter_path = os.path.join(chapters_folder, filename)
+            chapter_passages = extract_passages(chapter_path, CSCSTrivia.chapter_name_from_path(chapter_path))
+            print(f"✅ Indexed {filename}: {len(chapter_passages)} passages")
+            passages.extend(chapter_passages)
+        return cls.from_passages(passages)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({"passages": self.passages, "postings": self.postings, "lengths": self.lengths}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ChapterIndex":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data["passages"], data["postings"], data["lengths"])
+
+    @classmethod
+    def load_or_build(cls, path: str = "chapter_index.json", chapters_folder: str = "chapters") -> "ChapterIndex":
+        if os.path.exists(path):
+            return cls.load(path)
+        print(f"\n📇 Building chapter index from {chapters_folder}/...")
+        index = cls.build(chapters_folder)
+        index.save(path)
+        print(f"✅ Saved index of {len(index.passages)} passages to {path}")
+        return index
+
+    def search(self, query: str, top_k: int = 3,
+               chapter: Optional[str] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return the top_k (score, passage) pairs for a query, optionally within one chapter."""
+        total = len(self.passages)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, count in postings:
+                if chapter is not None and self.passages[passage_id]["chapter"] != chapter:
+                    continue
+                norm = K1 * (1 - B + B * self.lengths[passage_id] / self.avg_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * count * (K1 + 1) / (count + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+        return [(score, self.passages[passage_id]) for passage_id, score in ranked]
@@ -0,0 +1,238 @@
+import time
+
+_START_TIME = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+import importlib
+from typing import Callable, Dict, Tuple
+
+# Subcommands only import their pipeline module (and its heavy dependencies)
+# when they run, so cheap commands never load the Claude, TTS or video stacks.
+
+
+def questions_file(args) -> str:
+    """The question bank every stage reads and writes; batch runs cover the whole book."""
+    if args.questions:
+        return args.questions
+    if getattr(args, "batch", False):
+        return "all_chapters_questions.jsonl"
+    return "chapter1_questions.jsonl"
+
+
+def cmd_list(args) -> int:
+    """List the question bank without touching any API or video dependency."""
+    args.questions = questions_file(args)
+    if not os.path.exists(args.questions):
+        print(f"❌ Error: Questions file {args.questions} not found")
+        return 1
+    from question_bank import iter_questions
+
+    counts: Dict[str, int] = {}
+    total = 0
+    for total, question in enumerate(iter_questions(args.questions), 1):
+        counts[question.difficulty] = counts.get(question.difficulty, 0) + 1
+        print(f"{total:3}. [{question.chapter or '?'}] {question.difficulty}: {question.question}")
+    summary = ", ".join(f"{level}: {count}" for level, count in counts.items())
+    print(f"\n✅ {total} questions ({summary})")
+    return 0
+
+
+def cmd_generate(args) -> int:
+    import asyncio
+    trivia_questions = importlib.import_module("trivia_questions")
+    if args.batch:
+        succeeded = asyncio.run(trivia_questions.batch_main(use_local=args.local,
+                                                            output_file=questions_file(args)))
+    else:
+        succeeded = asyncio.run(trivia_questions.main(questions_file(args), use_local=args.local))
+    return 0 if succeeded else 1
+
+
+def cmd_index(args) -> int:
+    chapter_index = importlib.import_module("chapter_index")
+    index = chapter_index.ChapterIndex.build(args.chapters)
+    index.save(args.index)
+    print(f"\n✅ Saved index of {len(index.passages)} passages to {args.index}")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    import asyncio
+    answer_verifier = importlib.import_module("answer_verifier")
+    client = None
+    if args.local:
+        from local_batch_api import LocalAnthropicClient, supporting_responder
+        client = LocalAnthropicClient(responder=supporting_responder)
+    succeeded = asyncio.run(answer_verifier.verify_main(
+        questions_file(args), index_file=args.index, client=client
+    ))
+    return 0 if succeeded else 1
+
+
+def cmd_tts(args) -> int:
+    import asyncio
+    eleven_labs_tts = importlib.import_module("eleven_labs_tts")
+    return 0 if asyncio.run(eleven_labs_tts.main(questions_file(args))) else 1
+
+
+def cmd_durations(args) -> int:
+    get_audio_duration = importlib.import_module("get_audio_duration")
+    return 0 if get_audio_duration.main() else 1
+
+
+def cmd_render(args) -> int:
+    process_video = importlib.import_module("process_video")
+    video_url = args.video_url or process_video.DEFAULT_VIDEO_URL
+    return 0 if process_video.main(video_url, os.path.abspath(questions_file(args))) else 1
+
+
+def cmd_enqueue(args) -> int:
+    job_queue = importlib.import_module("job_queue")
+    queue = job_queue.JobQueue(args.queue)
+    payload = {"questions_file": os.path.abspath(questions_file(args))}
+    if args.kind == "render":
+        if not args.audio_folder:
+            print("❌ Error: render jobs need --audio-folder")
+            return 1
+        payload["audio_folder"] = os.path.abspath(args.audio_folder)
+        if args.video_url:
+            payload["video_url"] = args.video_url
+    job_id = queue.enqueue(args.kind, payload, max_attempts=args.max_attempts)
+    print(f"✅ Queued {args.kind} job {job_id} in {queue.db_path}")
+    return 0
+
+
+def cmd_worker(args) -> int:
+    job_queue = importlib.import_module("job_queue")
+    queue = job_queue.JobQueue(args.queue, lease_seconds=args.lease_seconds)
+    worker = job_queue.JobWorker(queue, kinds=args.kinds)
+    worker.run(once=args.once)
+    # A long-running worker outlives any one job; a --once run reports how its jobs went
+    return 1 if args.once and worker.failed_jobs else 0
+
+
+def cmd_jobs(args) -> int:
+    job_queue = importlib.import_module("job_queue")
+    queue = job_queue.JobQueue(args.queue)
+    jobs = queue.jobs(args.status)
+    for job in jobs:
+        if job["status"] == "succeeded":
+            detail = json.dumps(job["result"])
+        else:
+            detail = (job["error"] or "").split("\n", 1)[0]
+        print(f"{job['id']:4}. {job['kind']:<7} {job['status']:<10} attempts {job['attempts']}/{job['max_attempts']}"
+              f"  {job['worker'] or ''}  {detail}")
+    print(f"\n✅ {len(jobs)} jobs")
+    return 0
+
+
+def cmd_run_all(args) -> int:
+    for step in (cmd_generate, cmd_verify, cmd_tts, cmd_render):
+        status = step(args)
+        if status:
+            return status
+    return 0
+
+
+# name -> (handler, modules it imports, help text)
+COMMANDS: Dict[str, Tuple[Callable, Tuple[str, ...], str]] = {
+    "list": (cmd_list, ("question_bank",), "List questions in the question bank"),
+    "generate": (cmd_generate, ("trivia_questions",), "Generate questions from chapter PDFs"),
+    "index": (cmd_index, ("chapter_index",), "Build the section/page index over chapter PDFs"),
+    "verify": (cmd_verify, ("answer_verifier", "trivia_questions"),
+               "Check answers against retrieved textbook passages"),
+    "tts": (cmd_tts, ("eleven_labs_tts",), "Generate question audio with ElevenLabs"),
+    "durations": (cmd_durations, ("get_audio_duration",), "Check durations of generated audio"),
+    "render": (cmd_render, ("process_video",), "Render the final quiz video"),
+    "enqueue": (cmd_enqueue, ("job_queue",), "Queue a TTS or render job for distributed workers"),
+    "worker": (cmd_worker, ("job_queue", "eleven_labs_tts", "process_video"),
+               "Run a worker that pulls jobs from the queue"),
+    "jobs": (cmd_jobs, ("job_queue",), "List queued jobs and collected results"),
+    "run-all": (cmd_run_all, ("trivia_questions", "answer_verifier", "eleven_labs_tts", "process_video"),
+                "Generate, verify, synthesize and render in one go"),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cscs_quiz", description="CSCS quiz video pipeline")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Report how long the command takes to start (imports included), then exit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, (_, _, help_text) in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=help_text)
+        if name in ("list", "generate", "verify", "tts", "render", "run-all", "enqueue"):
+            sub.add_argument("--questions",
+                             help="Question bank file (default chapter1_questions.jsonl, "
+                                  "or all_chapters_questions.jsonl with --batch)")
+        if name in ("generate", "run-all"):
+            sub.add_argument("--batch", action="store_true",
+                             help="Submit all chapters through the Message Batches API")
+        if name in ("generate", "verify", "run-all"):
+            sub.add_argument("--local", action="store_true",
+                             help="Use the offline stand-in instead of the Anthropic API "
+                                  "(for generation and verification)")
+        if name in ("index", "verify", "run-all"):
+            sub.add_argument("--index", default="chapter_index.json", help="Chapter index file")
+        if name == "index":
+            sub.add_argument("--chapters", default="chapters", help="Folder of chapter PDFs")
+        if name in ("render", "enqueue", "run-all"):
+            sub.add_argument("--video-url", help="Background video URL")
+        if name in ("enqueue", "worker", "jobs"):
+            sub.add_argument("--queue", default="jobs", help="Queue folder shared by all workers")
+        if name == "enqueue":
+            sub.add_argument("kind", choices=("tts", "render"))
+            sub.add_argument("--audio-folder", help="Audio folder for render jobs (e.g. a TTS job's result)")
+            sub.add_argument("--max-attempts", type=int, default=3)
+        if name == "worker":
+            sub.add_argument("--kinds", nargs="+", choices=("tts", "render"),
+                             help="Only take these job kinds")
+            sub.add_argument("--lease-seconds", type=float, default=300.0)
+            sub.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        if name == "jobs":
+            sub.add_argument("--status", choices=("queued", "running", "succeeded", "failed"))
+    return parser
+
+
+def report_startup_time(command: str):
+    """Import everything the command needs and print where startup time went."""
+    _, modules, _ = COMMANDS[command]
+    cli_ready = time.perf_counter()
+    loaded_before = len(sys.modules)
+
+    for module_name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"❌ {module_name}: {e}")
+            continue
+        print(f"  {module_name}: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    finished = time.perf_counter()
+    print(f"⏱️ CLI ready: {(cli_ready - _START_TIME) * 1000:.1f} ms")
+    print(f"⏱️ Command imports: {(finished - cli_ready) * 1000:.1f} ms "
+          f"({len(sys.modules) - loaded_before} modules)")
+    print(f"⏱️ '{command}' startup: {(finished - _START_TIME) * 1000:.1f} ms "
+          f"(add python -X importtime for a per-module breakdown)")
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.startup_time:
+        report_startup_time(args.command)
+        return 0
+
+    handler, _, _ = COMMANDS[args.command]
+    try:
+        return handler(args)
+    except KeyboardInterrupt:
+        print("\n\n⚠️ Process interrupted by user")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
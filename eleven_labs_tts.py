@@ -1,13 +1,15 @@
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
 import os
-import json
+import sys
 
 import asyncio
+from typing import Iterable, Optional
+from pipeline_metrics import PipelineMetrics
+from question_bank import Question, iter_questions
 
 class CSCSTTSGenerator:
-    def __init__(self):
+    def __init__(self, metrics: Optional[PipelineMetrics] = None):
+        self.metrics = metrics or PipelineMetrics()
 
         print("\nDebugging Environment Setup:")
         print("---------------------------")
@@ -38,13 +40,14 @@ class CSCSTTSGenerator:
 
         # Initialize client if key exists
         if self.api_key:
+            from elevenlabs.client import ElevenLabs
             self.client = ElevenLabs(api_key=self.api_key)
             print("✅ ElevenLabs client initialized")
         else:
             raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
     
         
-    def format_tts_text(self, question_data):
+    def format_tts_text(self, question_data: Question):
         """Format the text for TTS in an engaging way."""
         # Attention grabbers based on difficulty
         difficulty_intros = {
@@ -54,40 +57,40 @@ class CSCSTTSGenerator:
             "Intense": "This is an advanced CSCS concept. Are you ready?"
         }
         
-        intro = difficulty_intros.get(question_data['difficulty'], "Here's your CSCS trivia question.")
+        intro = difficulty_intros.get(question_data.difficulty, "Here's your CSCS trivia question.")
         
         # Format the question section with pauses
         tts_text = f"""{intro}
         
         <break time="500ms"/>
-        {question_data['question']}
+        {question_data.question}
         
         <break time="800ms"/>
         Let's look at your options:
         <break time="500ms"/>
         
-        A) {question_data['options']['A']}
+        A) {question_data.option('A')}
         <break time="400ms"/>
-        B) {question_data['options']['B']}
+        B) {question_data.option('B')}
         <break time="400ms"/>
-        C) {question_data['options']['C']}
+        C) {question_data.option('C')}
         <break time="400ms"/>
-        D) {question_data['options']['D']}
+        D) {question_data.option('D')}
         
         <break time="5s"/>
         Time's up!
         <break time="500ms"/>
         
-        The correct answer is {question_data['correct_answer']}.
+        The correct answer is {question_data.correct_answer}.
         
         <break time="500ms"/>
         Here's why this is correct:
         <break time="300ms"/>
-        {question_data['explanation']}"""
+        {question_data.explanation}"""
         
         return tts_text
 
-    async def generate_audio_for_question(self, question_data, index, output_folder="audio_output", voice_id="21m00Tcm4TlvDq8ikWAM"):
+    async def generate_audio_for_question(self, question_data: Question, index, output_folder="audio_output", voice_id="21m00Tcm4TlvDq8ikWAM"):
         """Generate TTS audio for a CSCS trivia question."""
         # Create output folder if it doesn't exist
         os.makedirs(output_folder, exist_ok=True)
@@ -97,19 +100,27 @@ class CSCSTTSGenerator:
         
         try:
             # Generate unique filename including difficulty level
-            safe_filename = f"Question {index} - {question_data['difficulty']}.mp3"
+            safe_filename = f"Question {index} - {question_data.difficulty}.mp3"
             output_path = os.path.join(output_folder, safe_filename)
             
             # Generate audio
-            audio_generator = await asyncio.to_thread(
-                self.client.generate,
-                text=tts_text,
-                voice=voice_id,
-                model="eleven_monolingual_v1"
-            )
-            
-            #Convert generator to bytes
-            audio_bytes = b"".join(audio_generator)
+            with self.metrics.span("tts_request", question=index, difficulty=question_data.difficulty) as span:
+                audio_generator = await asyncio.to_thread(
+                    self.client.generate,
+                    text=tts_text,
+                    voice=voice_id,
+                    model="eleven_monolingual_v1"
+                )
+                
+                #Convert generator to bytes (the stream is consumed here, so keep it inside the span)
+                audio_bytes = await asyncio.to_thread(b"".join, audio_generator)
+                span["characters"] = len(tts_text)
+                span["audio_bytes"] = len(audio_bytes)
+
+            # ElevenLabs bills per character of submitted text, markup included
+            self.metrics.increment("tts_requests", voice=voice_id)
+            self.metrics.increment("tts_billed_characters", len(tts_text), voice=voice_id)
+            self.metrics.increment("tts_audio_bytes", len(audio_bytes), voice=voice_id)
 
             # Save audio file
             async with asyncio.Lock():
@@ -120,58 +131,83 @@ class CSCSTTSGenerator:
             return output_path
             
         except Exception as e:
+            self.metrics.increment("tts_errors", voice=voice_id)
             print(f"❌ Error generating audio: {str(e)}")
             return None
 
-    async def process_questions(self, questions, output_folder="audio_output"):
-        """Process all trivia questions and generate audio concurrently."""
-        total_questions = len(questions)
-        print(f"\nProcessing {total_questions} questions...")
-        
-        # Process questions concurrently
-        tasks = []
-        for i, question in enumerate(questions, 1):
-            print(f"\nQueuing question {i}/{total_questions} | Difficulty: {question['difficulty']}")
-            task = self.generate_audio_for_question(question, i, output_folder)
-            tasks.append(task)
-        
-        # Wait for all audio generation tasks to complete
-        audio_files = await asyncio.gather(*tasks)
-        audio_files = [f for f in audio_files if f]  # Remove None values
+    async def process_questions(self, questions: Iterable[Question], output_folder="audio_output",
+                                max_concurrent: int = 5):
+        """Process trivia questions and generate audio concurrently.
+
+        Questions are pulled from the iterable as slots free up, so a lazily
+        read bank never has to be held in memory at once.
+        """
+        print("\nProcessing questions...")
+        
+        # Process questions concurrently, keeping at most max_concurrent in flight
+        pending = set()
+        results = {}
+        total_questions = 0
+
+        async def generate(question, index):
+            results[index] = await self.generate_audio_for_question(question, index, output_folder)
+
+        with self.metrics.span("tts_batch") as span:
+            try:
+                for i, question in enumerate(questions, 1):
+                    total_questions = i
+                    print(f"\nQueuing question {i} | Difficulty: {question.difficulty}")
+                    pending.add(asyncio.create_task(generate(question, i)))
+                    if len(pending) >= max_concurrent:
+                        _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            except BaseException:
+                # The question source failed; don't leave requests running unawaited
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise
+            # Wait for the remaining audio generation tasks to complete
+            if pending:
+                await asyncio.wait(pending)
+            span["questions"] = total_questions
+
+        audio_files = [results[i] for i in sorted(results) if results[i]]  # Remove None values
         
         print(f"\n✅ Successfully generated {len(audio_files)}/{total_questions} audio files")
         return audio_files
 
-async def main():
+async def main(questions_file: str = "chapter1_questions.jsonl") -> bool:
+    """Generate audio for the question bank. Returns True if any audio was generated."""
     try:
         # Check for API key
         if not os.getenv('ELEVENLABS_API_KEY'):
             print("❌ Error: ELEVENLABS_API_KEY not found in .env file")
-            return
+            return False
         
-        # Load questions from JSON file
-        json_file = "chapter1_questions.json"
-        if not os.path.exists(json_file):
-            print(f"❌ Error: Questions file {json_file} not found")
-            return
+        # Stream questions from the JSON Lines bank
+        if not os.path.exists(questions_file):
+            print(f"❌ Error: Questions file {questions_file} not found")
+            return False
             
-        with open(json_file, 'r') as f:
-            questions = json.load(f)
-        
-        if questions:
-            # Initialize generator and process questions
-            tts_gen = CSCSTTSGenerator()
-            audio_files = await tts_gen.process_questions(questions)
-            
-            if audio_files:
-                print("\nGenerated audio files:")
-                for file in audio_files:
-                    print(file)
+        # Initialize generator and process questions
+        tts_gen = CSCSTTSGenerator()
+        audio_files = await tts_gen.process_questions(iter_questions(questions_file, tts_gen.metrics))
+        
+        if audio_files:
+            print("\nGenerated audio files:")
+            for file in audio_files:
+                print(file)
         else:
-            print("❌ No questions found in JSON file")
+            print("❌ No audio generated from the questions file")
+
+        tts_gen.metrics.print_summary()
+        tts_gen.metrics.export_jsonl("metrics/tts_metrics.jsonl")
+        tts_gen.metrics.export_prometheus("metrics/tts.prom", stage="tts")
+        return bool(audio_files)
             
     except Exception as e:
         print(f"❌ Critical error: {str(e)}")
+        return False
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(0 if asyncio.run(main()) else 1)
\ No newline at end of file
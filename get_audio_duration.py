@@ -1,10 +1,13 @@
 import os
+import sys
 import subprocess
 import time
 from typing import Dict, Tuple, Optional
+from pipeline_metrics import PipelineMetrics
 
 class AudioDurationChecker:
-    def __init__(self):
+    def __init__(self, metrics: Optional[PipelineMetrics] = None):
+        self.metrics = metrics or PipelineMetrics()
         self.audio_folder = "audio_output"
         self.total_files_processed = 0
         self.start_time = time.time()
@@ -52,7 +55,7 @@ class AudioDurationChecker:
         
         try:
             cmd = f'ffprobe -i "{full_path}" -show_entries format=duration -v quiet -of csv="p=0"'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            result = self.metrics.run_subprocess(cmd, "ffprobe", shell=True, capture_output=True, text=True)
 
             if result.returncode != 0:
                 print(f"❌ ffprobe failed for {file_path}")
@@ -111,7 +114,7 @@ class AudioDurationChecker:
 
         return total_duration, file_durations
 
-def main():
+def main() -> bool:
     try:
         checker = AudioDurationChecker()
         total_duration, durations = checker.check_audio_durations()
@@ -120,12 +123,14 @@ def main():
             print("\n✅ Analysis completed successfully")
         else:
             print("\n⚠️ Analysis completed with errors")
+        return bool(durations)
 
     except KeyboardInterrupt:
         print("\n\n⚠️ Process interrupted by user")
     except Exception as e:
         print(f"\n❌ Critical error: {str(e)}")
         print("Please check the error message and try again.")
+    return False
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import traceback
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+# Jobs stay "queued" until a worker claims them. A claimed job is "running"
+# under a lease the worker must renew; an expired lease makes the job
+# claimable again. Failed attempts are retried until max_attempts is reached.
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+"""
+
+
+class JobQueue:
+    def __init__(self, root: str = "jobs", lease_seconds: float = 300.0, retry_delay: float = 30.0):
+        """Durable job queue backed by a SQLite file, shareable by several worker processes.
+
+        Workers on other hosts can share it over a common filesystem; SQLite's
+        default rollback journal is used because WAL mode needs shared memory
+        and does not work across network mounts.
+        """
+        self.root = os.path.abspath(root)
+        self.db_path = os.path.join(self.root, "queue.db")
+        self.work_root = os.path.join(self.root, "work")
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        os.makedirs(self.work_root, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A fresh connection per call keeps the queue safe to use from heartbeat threads
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def work_dir(self, job_id: int, attempt: int) -> str:
+        """Private directory for one attempt at a job.
+
+        Keyed by attempt so a retry or a reclaimed lease never shares a folder
+        with a previous worker that may still be writing to it.
+        """
+        return os.path.join(self.work_root, f"job-{job_id}-{attempt}")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = 3) -> int:
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), QUEUED, max_attempts, now, now, now),
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def claim(self, worker: str, kinds: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Lease the oldest claimable job, or return None if there is none."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers never claim the same row.
+            # If it times out there is no transaction to roll back, so let that error through.
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            conn.close()
+            raise
+        try:
+            self._expire_leases(conn, now)
+
+            query = "SELECT * FROM jobs WHERE status = ? AND available_at <= ?"
+            params: List[Any] = [QUEUED, now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (RUNNING, worker, now + self.lease_seconds, now, row["id"]),
+            )
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job["work_dir"] = self.work_dir(job["id"], job["attempts"])
+        os.makedirs(job["work_dir"], exist_ok=True)
+        return job
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        """Requeue (or fail) running jobs whose worker stopped heartbeating."""
+        conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "error = 'Lease expired (worker stopped heartbeating)', worker = NULL, "
+            "lease_expires = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (FAILED, QUEUED, now, RUNNING, now),
+        )
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Extend a lease. Returns False if the worker no longer holds it."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> bool:
+        """Record a job's result. Returns False if the lease was lost to another worker."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (SUCCEEDED, json.dumps(result), now, job_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Record a failed attempt, requeueing the job after retry_delay if attempts remain."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+                "error = ?, worker = NULL, lease_expires = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (FAILED, QUEUED, error, now + self.retry_delay, now, job_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List jobs (optionally by status) with their payloads and results."""
+        conn = self._connect()
+        try:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+            return [self._to_job(row) for row in rows]
+        finally:
+            conn.close()
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_job(row) if row else None
+        finally:
+            conn.close()
+
+
+def run_tts_job(payload: Dict[str, Any], work_dir: str) -> Dict[str, Any]:
+    """Generate question audio into the job's own audio_output folder."""
+    import asyncio
+    from eleven_labs_tts import CSCSTTSGenerator
+    from pipeline_metrics import PipelineMetrics
+    from question_bank import iter_questions
+
+    metrics = PipelineMetrics()
+    output_folder = os.path.join(work_dir, "audio_output")
+    tts_gen = CSCSTTSGenerator(metrics=metrics)
+    audio_files = asyncio.run(tts_gen.process_questions(
+        iter_questions(os.path.abspath(payload["questions_file"]), metrics), output_folder
+    ))
+    metrics.export_jsonl(os.path.join(work_dir, "metrics", "tts_metrics.jsonl"))
+    if not audio_files:
+        raise Exception("No audio files were generated")
+    return {"audio_folder": output_folder, "audio_files": audio_files}
+
+
+def run_render_job(payload: Dict[str, Any], work_dir: str) -> Dict[str, Any]:
+    """Render the quiz video entirely inside the job's work directory."""
+    from process_video import VideoProcessor, DEFAULT_VIDEO_URL
+    from pipeline_metrics import PipelineMetrics
+
+    processor = VideoProcessor(
+        payload.get("video_url", DEFAULT_VIDEO_URL),
+        metrics=PipelineMetrics(),
+        work_dir=work_dir,
+        audio_folder=os.path.abspath(payload["audio_folder"]),
+        questions_file=os.path.abspath(payload["questions_file"]),
+    )
+    if not processor.run():
+        raise Exception("Video processing failed")
+    return {"video": processor.final_output}
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    "tts": run_tts_job,
+    "render": run_render_job,
+}
+
+
+class JobWorker:
+    def __init__(self, queue: JobQueue, kinds: Optional[Sequence[str]] = None,
+                 handlers: Optional[Dict[str, Callable]] = None, poll_interval: float = 5.0):
+        """Pull jobs from a queue and run them, heartbeating while each one runs."""
+        self.queue = queue
+        self.handlers = handlers or JOB_HANDLERS
+        self.kinds = list(kinds) if kinds else list(self.handlers)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.failed_jobs = 0
+
+    def _heartbeat_loop(self, job_id: int, stop: threading.Event, lost: threading.Event):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job_id, self.worker_id):
+                lost.set()
+                return
+
+    def run_one(self) -> bool:
+        """Claim and run a single job. Returns False if nothing was claimable."""
+        job = self.queue.claim(self.worker_id, self.kinds)
+        if job is None:
+            return False
+
+        job_id = job["id"]
+        print(f"\n🛠️ [{self.worker_id}] Job {job_id} ({job['kind']}) attempt {job['attempts']}/{job['max_attempts']}")
+        stop, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job_id, stop, lost), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handlers[job["kind"]](job["payload"], job["work_dir"])
+        except Exception as e:
+            stop.set()
+            heartbeat.join()
+            self.queue.fail(job_id, self.worker_id, f"{e}\n{traceback.format_exc()}")
+            self.failed_jobs += 1
+            print(f"❌ Job {job_id} failed: {str(e)}")
+            return True
+
+        stop.set()
+        heartbeat.join()
+        if lost.is_set() or not self.queue.complete(job_id, self.worker_id, result):
+            print(f"⚠️ Job {job_id} finished after its lease was lost; result discarded")
+        else:
+            print(f"✅ Job {job_id} succeeded")
+        return True
+
+    def run(self, once: bool = False):
+        """Process jobs until the queue is empty (once=True) or forever."""
+        print(f"\n👷 Worker {self.worker_id} watching {self.queue.db_path} for: {', '.join(self.kinds)}")
+        try:
+            while True:
+                if self.run_one():
+                    continue
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("\n\n⚠️ Worker interrupted by user")
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import uuid
+import re
+import hashlib
+from types import SimpleNamespace
+from typing import Callable, Dict, Any, Iterator, List, Optional
+from question_bank import iter_questions
+
+
+# Prefix hash -> expiry time, mimicking the API's five minute ephemeral cache
+_prompt_cache: Dict[str, float] = {}
+CACHE_TTL_SECONDS = 300
+
+
+class BatchNotFoundError(Exception):
+    """Raised for unknown batch ids, with the same status_code as anthropic.NotFoundError."""
+    status_code = 404
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _blocks(content) -> List[Dict[str, Any]]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return list(content)
+
+
+def _usage_for(params: Dict[str, Any], output_text: str) -> SimpleNamespace:
+    """Split input tokens into cache reads, cache writes and uncached tokens."""
+    blocks = _blocks(params["system"])
+    for message in params["messages"]:
+        blocks.extend(_blocks(message["content"]))
+
+    # The cached prefix runs up to the last block marked with cache_control
+    breakpoint_index = max((i for i, b in enumerate(blocks) if b.get("cache_control")), default=-1)
+    prefix_text = "".join(b["text"] for b in blocks[:breakpoint_index + 1])
+    suffix_text = "".join(b["text"] for b in blocks[breakpoint_index + 1:])
+
+    cache_read = cache_write = 0
+    if prefix_text:
+        key = hashlib.sha256(prefix_text.encode()).hexdigest()
+        now = time.time()
+        if _prompt_cache.get(key, 0) > now:
+            cache_read = _estimate_tokens(prefix_text)
+        else:
+            cache_write = _estimate_tokens(prefix_text)
+        _prompt_cache[key] = now + CACHE_TTL_SECONDS
+
+    return SimpleNamespace(
+        input_tokens=_estimate_tokens(suffix_text) if suffix_text else 0,
+        cache_read_input_tokens=cache_read,
+        cache_creation_input_tokens=cache_write,
+        output_tokens=_estimate_tokens(output_text),
+    )
+
+
+def sample_responder(params: Dict[str, Any]) -> str:
+    """Answer every prompt with the saved chapter 1 questions."""
+    sample_file = "chapter1_questions.jsonl"
+    if os.path.exists(sample_file):
+        questions = [q.to_dict() for q in iter_questions(sample_file)]
+    else:
+        questions = [{
+            "difficulty": "Easy",
+            "question": "Placeholder question?",
+            "options": {"A": "One", "B": "Two", "C": "Three", "D": "Four"},
+            "correct_answer": "A",
+            "explanation": "Placeholder explanation."
+        }]
+    for q in questions:
+        q.pop("chapter", None)
+    return json.dumps({"questions": questions})
+
+
+def supporting_responder(params: Dict[str, Any]) -> str:
+    """Mark every question in a verification prompt as supported."""
+    prompt = "".join(b["text"] for b in _blocks(params["messages"][-1]["content"]))
+    count = len(re.findall(r"^Question \d+:", prompt, flags=re.MULTILINE))
+    return json.dumps({"results": [
+        {"id": i, "supported": True, "reason": "Local stand-in does not check content."}
+        for i in range(1, count + 1)
+    ]})
+
+
+def _make_message(params: Dict[str, Any], text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=f"msg_local_{uuid.uuid4().hex[:12]}",
+        model=params["model"],
+        role="assistant",
+        content=[SimpleNamespace(type="text", text=text)],
+        stop_reason="end_turn",
+        usage=_usage_for(params, text),
+    )
+
+
+class LocalMessageBatches:
+    def __init__(self, storage_dir: str, responder: Callable[[Dict[str, Any]], str],
+                 processing_delay: float):
+        """File-backed stand-in for client.messages.batches."""
+        self.storage_dir = storage_dir
+        self.responder = responder
+        self.processing_delay = processing_delay
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+    def _path(self, batch_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{batch_id}.json")
+
+    def _load(self, batch_id: str) -> Dict[str, Any]:
+        path = self._path(batch_id)
+        if not os.path.exists(path):
+            raise BatchNotFoundError(f"Batch not found: {batch_id}")
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save(self, batch: Dict[str, Any]):
+        with open(self._path(batch["id"]), 'w') as f:
+            json.dump(batch, f)
+
+    @staticmethod
+    def _to_object(batch: Dict[str, Any]) -> SimpleNamespace:
+        results = batch.get("results", {})
+        succeeded = sum(1 for r in results.values() if r["type"] == "succeeded")
+        errored = sum(1 for r in results.values() if r["type"] == "errored")
+        return SimpleNamespace(
+            id=batch["id"],
+            type="message_batch",
+            processing_status=batch["processing_status"],
+            created_at=batch["created_at"],
+            ended_at=batch.get("ended_at"),
+            request_counts=SimpleNamespace(
+                processing=len(batch["requests"]) - len(results),
+                succeeded=succeeded,
+                errored=errored,
+                canceled=0,
+                expired=0,
+            ),
+        )
+
+    def create(self, requests: List[Dict[str, Any]]) -> SimpleNamespace:
+        custom_ids = [r["custom_id"] for r in requests]
+        if len(set(custom_ids)) != len(custom_ids):
+            raise ValueError("custom_id values must be unique within a batch")
+        batch = {
+            "id": f"msgbatch_local_{uuid.uuid4().hex[:16]}",
+            "processing_status": "in_progress",
+            "created_at": time.time(),
+            "requests": requests,
+        }
+        self._save(batch)
+        return self._to_object(batch)
+
+    def retrieve(self, batch_id: str) -> SimpleNamespace:
+        batch = self._load(batch_id)
+        if batch["processing_status"] == "in_progress" and \
+                time.time() - batch["created_at"] >= self.processing_delay:
+            self._process(batch)
+        return self._to_object(batch)
+
+    def _process(self, batch: Dict[str, Any]):
+        results = {}
+        for request in batch["requests"]:
+            try:
+                text = self.responder(request["params"])
+                message = _make_message(request["params"], text)
+                results[request["custom_id"]] = {
+                    "type": "succeeded",
+                    "message": json.loads(json.dumps(message, default=vars)),
+                }
+            except Exception as e:
+                results[request["custom_id"]] = {"type": "errored", "error": str(e)}
+        batch["results"] = results
+        batch["processing_status"] = "ended"
+        batch["ended_at"] = time.time()
+        self._save(batch)
+
+    def results(self, batch_id: str) -> Iterator[SimpleNamespace]:
+        batch = self._load(batch_id)
+        if batch["processing_status"] != "ended":
+            raise Exception(f"Batch {batch_id} has not finished processing")
+        for custom_id, result in batch["results"].items():
+            # Round-trip through JSON so attribute access matches the SDK objects
+            yield json.loads(
+                json.dumps({"custom_id": custom_id, "result": result}),
+                object_hook=lambda d: SimpleNamespace(**d),
+            )
+
+
+class LocalMessages:
+    def __init__(self, batches: LocalMessageBatches, responder: Callable[[Dict[str, Any]], str]):
+        self.batches = batches
+        self.responder = responder
+
+    def create(self, **params) -> SimpleNamespace:
+        return _make_message(params, self.responder(params))
+
+
+class LocalAnthropicClient:
+    def __init__(self, storage_dir: str = "local_batches",
+                 responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 processing_delay: float = 2.0):
+        """Offline stand-in for anthropic.Anthropic covering messages and message batches.
+
+        Batches are persisted under storage_dir, so a crashed run can resume
+        against the same batch id from a new process.
+        """
+        responder = responder or sample_responder
+        self.messages = LocalMessages(
+            LocalMessageBatches(storage_dir, responder, processing_delay),
+            responder,
+        )
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+# Stack of open span ids for the current task; asyncio tasks copy the
+# context on creation so concurrent items nest under the right parent.
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_span", default=None)
+
+# A child's ru_maxrss on Linux includes the memory it inherited from its parent
+# before exec, so reaping ffmpeg straight from this process would report our
+# own size. This bare interpreter starts the tool and reports the tool's
+# rusage instead; the figure is floored at the helper's few MB, not ours.
+_RSS_HELPER = """
+import os, sys, signal
+fd = int(sys.argv[1])
+pid = os.fork()
+if pid == 0:
+    os.close(fd)
+    try:
+        os.execvp(sys.argv[2], sys.argv[2:])
+    except OSError as e:
+        os.write(2, f"{sys.argv[2]}: {e}\\n".encode())
+        os._exit(127)
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+_, status, usage = os.wait4(pid, 0)
+os.write(fd, str(usage.ru_maxrss).encode())
+code = os.waitstatus_to_exitcode(status)
+if code < 0:
+    signal.signal(-code, signal.SIG_DFL)
+    os.kill(os.getpid(), -code)
+sys.exit(code)
+"""
+
+
+class PipelineMetrics:
+    def __init__(self, prefix: str = "cscs"):
+        """Collect timing spans, counters and gauges for one pipeline run."""
+        self.prefix = prefix
+        self.run_start = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._next_span_id = 1
+
+    @staticmethod
+    def _label_key(labels: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block of work, nested under whichever span is currently open."""
+        span_id = self._next_span_id
+        self._next_span_id += 1
+        record = {
+            "type": "span",
+            "span_id": span_id,
+            "parent_id": _current_span.get(),
+            "name": name,
+            "start": time.time(),
+            "attributes": dict(attributes),
+            "status": "ok",
+        }
+        token = _current_span.set(span_id)
+        started = time.perf_counter()
+        try:
+            yield record["attributes"]
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+            raise
+        finally:
+            record["duration_seconds"] = time.perf_counter() - started
+            _current_span.reset(token)
+            self.spans.append(record)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add to a monotonically increasing counter."""
+        key = (name, self._label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Record the latest value of a gauge."""
+        self.gauges[(name, self._label_key(labels))] = value
+
+    def max_gauge(self, name: str, value: float, **labels):
+        """Record a gauge, keeping the highest value seen."""
+        key = (name, self._label_key(labels))
+        self.gauges[key] = max(self.gauges.get(key, value), value)
+
+    def run_subprocess(self, cmd, tool: str, **kwargs) -> subprocess.CompletedProcess:
+        """Run an external tool (ffmpeg/ffprobe), recording wall time and its own peak RSS."""
+        with self.span(f"{tool}_subprocess", tool=tool) as attributes:
+            started = time.perf_counter()
+            result, peak_rss = self._run_and_reap(cmd, **kwargs)
+            wall_time = time.perf_counter() - started
+            attributes["returncode"] = result.returncode
+            if peak_rss is not None:
+                attributes["peak_rss_bytes"] = peak_rss
+
+        self.increment("subprocess_calls", tool=tool)
+        self.increment("subprocess_wall_seconds", wall_time, tool=tool)
+        if peak_rss is not None:
+            self.max_gauge("subprocess_peak_rss_bytes", peak_rss, tool=tool)
+        return result
+
+    @staticmethod
+    def _run_and_reap(cmd, shell: bool = False, **kwargs) -> Tuple[subprocess.CompletedProcess, Optional[int]]:
+        """Run cmd under _RSS_HELPER and read back the tool's own peak RSS."""
+        if not hasattr(os, "fork"):  # Windows
+            return subprocess.run(cmd, shell=shell, **kwargs), None
+
+        if shell:
+            argv = ["/bin/sh", "-c", cmd]
+        else:
+            argv = [cmd] if isinstance(cmd, (str, bytes, os.PathLike)) else list(cmd)
+        read_fd, write_fd = os.pipe()
+        try:
+            result = subprocess.run(
+                [sys.executable, "-I", "-S", "-c", _RSS_HELPER, str(write_fd), *map(os.fsdecode, argv)],
+                pass_fds=(write_fd,), **kwargs
+            )
+        finally:
+            os.close(write_fd)
+            with os.fdopen(read_fd, "rb") as f:
+                reported = f.read()
+
+        peak_rss = None
+        if reported:
+            # Linux reports kilobytes, macOS reports bytes
+            peak_rss = int(reported) if sys.platform == "darwin" else int(reported) * 1024
+        return subprocess.CompletedProcess(cmd, result.returncode, result.stdout, result.stderr), peak_rss
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate span durations by name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.spans:
+            entry = totals.setdefault(record["name"], {"count": 0, "seconds": 0.0, "errors": 0})
+            entry["count"] += 1
+            entry["seconds"] += record["duration_seconds"]
+            if record["status"] == "error":
+                entry["errors"] += 1
+        return totals
+
+    def export_jsonl(self, path: str):
+        """Write every span, counter and gauge as one JSON object per line."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            for record in sorted(self.spans, key=lambda r: r["start"]):
+                f.write(json.dumps(record) + "\n")
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+                for (name, labels), value in sorted(values.items()):
+                    f.write(json.dumps({
+                        "type": kind,
+                        "name": name,
+                        "labels": dict(labels),
+                        "value": value,
+                    }) + "\n")
+
+    def _prometheus_name(self, name: str) -> str:
+        return f"{self.prefix}_{name}"
+
+    @staticmethod
+    def _prometheus_labels(labels) -> str:
+        if not labels:
+            return ""
+        parts = []
+        for key, value in labels:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            parts.append(f'{key}="{escaped}"')
+        return "{" + ",".join(parts) + "}"
+
+    def to_prometheus(self, **stage_labels) -> str:
+        """Render metrics in the Prometheus text exposition format.
+
+        stage_labels (e.g. stage="tts") are added to every series, so files
+        from different stages never export the same series twice.
+        """
+        lines = []
+        for kind, values, suffix in (("counter", self.counters, "_total"), ("gauge", self.gauges, "")):
+            names = sorted({name for name, _ in values})
+            for name in names:
+                metric = self._prometheus_name(name) + suffix
+                lines.append(f"# TYPE {metric} {kind}")
+                for (key_name, labels), value in sorted(values.items()):
+                    if key_name == name:
+                        labels = self._label_key({**dict(labels), **stage_labels})
+                        lines.append(f"{metric}{self._prometheus_labels(labels)} {value}")
+
+        totals = self.stage_totals()
+        if totals:
+            metric = self._prometheus_name("span_duration_seconds")
+            lines.append(f"# TYPE {metric} summary")
+            for name, entry in sorted(totals.items()):
+                labels = self._prometheus_labels(self._label_key({"span": name, **stage_labels}))
+                lines.append(f"{metric}_sum{labels} {entry['seconds']}")
+                lines.append(f"{metric}_count{labels} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str, **stage_labels):
+        """Write a Prometheus textfile atomically so a scraper never reads half a file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus(**stage_labels))
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        """Print where the run spent its time and money."""
+        print("\n📈 Pipeline Metrics")
+        print("--------------------------------")
+        print(f"Run time: {time.time() - self.run_start:.2f} seconds")
+        for name, entry in sorted(self.stage_totals().items(), key=lambda kv: -kv[1]["seconds"]):
+            print(f"{name}: {entry['count']} x, {entry['seconds']:.2f} seconds, {entry['errors']} errors")
+        for (name, labels), value in sorted(self.counters.items()):
+            label_text = ", ".join(f"{k}={v}" for k, v in labels)
+            print(f"{name}{f' ({label_text})' if label_text else ''}: {value:g}")
@@ -1,23 +1,25 @@
 import os
-import subprocess
-import json
-from moviepy.video.fx.FadeIn import FadeIn
-from moviepy.video.fx.FadeOut import FadeOut
-from moviepy import (
-    VideoFileClip,
-    AudioFileClip,
-    TextClip,
-    CompositeVideoClip
-)
+import sys
+from typing import Iterable, Optional
+from pipeline_metrics import PipelineMetrics
+from question_bank import Question, iter_questions
 
 class VideoProcessor:
-    def __init__(self, video_url: str):
-        """Initialize the video processor with paths and URL."""
+    def __init__(self, video_url: str, metrics: Optional[PipelineMetrics] = None,
+                 work_dir: Optional[str] = None, audio_folder: Optional[str] = None,
+                 questions_file: Optional[str] = None):
+        """Initialize the video processor with paths and URL.
+
+        Everything the run writes (temp files, output, metrics) goes under
+        work_dir, so separate jobs never share a temp folder.
+        """
         self.video_url = video_url
-        self.base_dir = os.getcwd()
+        self.metrics = metrics or PipelineMetrics()
+        self.base_dir = os.path.abspath(work_dir or os.getcwd())
         self.output_folder = os.path.join(self.base_dir, "processed_output")
         self.temp_folder = os.path.join(self.base_dir, "temp")
-        self.audio_folder = os.path.join(self.base_dir, "audio_output")
+        self.audio_folder = audio_folder or os.path.join(self.base_dir, "audio_output")
+        self.questions_file = questions_file or os.path.join(self.base_dir, "chapter1_questions.jsonl")
 
         # File paths
         self.temp_video = os.path.join(self.temp_folder, "downloaded_video.mp4")
@@ -40,7 +42,7 @@ class VideoProcessor:
                 ],
             }
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self.metrics.span("video_download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 print("🔍 Finding video stream...")
                 ydl.download([self.video_url])
 
@@ -66,7 +68,7 @@ class VideoProcessor:
             
             cmd = f'ffmpeg -f concat -safe 0 -i "{self.audio_list_file}" -c copy "{self.output_audio}"'
             print(f"Running command: {cmd}")
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            result = self.metrics.run_subprocess(cmd, "ffmpeg", shell=True, capture_output=True, text=True)
 
             if result.returncode != 0:
                 print(f"❌ Failed to merge audio files: {result.stderr}")
@@ -79,9 +81,17 @@ class VideoProcessor:
             print(f"❌ Error during audio merge: {e}")
             return False
         
-    def create_final_video(self, questions_data):
+    def create_final_video(self, questions_data: Iterable[Question]):
         """Create video with text overlays and audio."""
         print("\n🎬 Creating final video with text overlays...")
+        # MoviePy is slow to import, so only load it once rendering starts
+        from moviepy import (
+            VideoFileClip,
+            AudioFileClip,
+            TextClip,
+            CompositeVideoClip
+        )
+
         try:
             # Load the background video and audio
             video = VideoFileClip(self.temp_video)
@@ -95,8 +105,8 @@ class VideoProcessor:
             
             for i, question in enumerate(questions_data):
                 # Format the text
-                question_text = f"Question {i + 1}:\n{question['question']}"
-                options_text = "\n".join([f"{k}) {v}" for k, v in question['options'].items()])
+                question_text = f"Question {i + 1}:\n{question.question}"
+                options_text = "\n".join([f"{k}) {v}" for k, v in question.option_items()])
 
                 # Create text clips with proper fadein effect
                 question_clip = TextClip(
@@ -128,12 +138,13 @@ class VideoProcessor:
 
             # Write the final video
             print("💾 Saving final video with overlays...")
-            final.write_videofile(
-                self.final_output,
-                codec='libx264',
-                audio_codec='aac',
-                fps=30
-            )
+            with self.metrics.span("video_render", questions=len(clips) // 2):
+                final.write_videofile(
+                    self.final_output,
+                    codec='libx264',
+                    audio_codec='aac',
+                    fps=30
+                )
 
             # Clean up
             video.close()
@@ -146,8 +157,8 @@ class VideoProcessor:
                 print(f"❌ Error creating video with overlays: {str(e)}")
                 raise
             
-    def run(self):
-            """Run the complete video processing pipeline."""
+    def run(self) -> bool:
+            """Run the complete video processing pipeline. Returns True if the video was created."""
             try:
                 print("\n Starting Video Processing")
                 print("===================================")
@@ -179,21 +190,22 @@ class VideoProcessor:
                 
                 # Get merged audio duration
                 cmd = f'ffprobe -i "{self.output_audio}" -show_entries format=duration -v quiet -of csv="p=0"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+                result = self.metrics.run_subprocess(cmd, "ffprobe", shell=True, capture_output=True, text=True)
                 total_duration = float(result.stdout.strip())
                 print(f"📊 Total audio duration: {total_duration:.2f} seconds")
 
                 # Load questions data for overlay
-                with open('chapter1_questions.json', 'r') as f:
-                    questions_data = json.load(f)
+                questions_data = iter_questions(self.questions_file, self.metrics)
 
                 # Create final video with overlays
                 self.create_final_video(questions_data)
 
                 print(f"\n✅ Final video created: {self.final_output}")
+                return True
             
             except Exception as e:
                 print(f"\n❌ Error: {str(e)}")
+                return False
             finally:
                 # Cleanup
                 print("\n Cleaning up temporary files...")
@@ -208,12 +220,15 @@ class VideoProcessor:
                     except:
                         pass
                 print("✅ Temporary files cleaned up")
+                self.metrics.print_summary()
+                self.metrics.export_jsonl(os.path.join(self.base_dir, "metrics", "video_metrics.jsonl"))
+                self.metrics.export_prometheus(os.path.join(self.base_dir, "metrics", "video.prom"), stage="video")
     
-# def main():
-#     #Replace with video URL
-#     video_url = "https://youtu.be/nNTxtEI9dZw?si=qPmXciccTkEWIlge"
-#     processor = VideoProcessor(video_url)
-#     processor.run()
+DEFAULT_VIDEO_URL = "https://youtu.be/nNTxtEI9dZw?si=qPmXciccTkEWIlge"
+
+def main(video_url: str = DEFAULT_VIDEO_URL, questions_file: Optional[str] = None) -> bool:
+    processor = VideoProcessor(video_url, questions_file=questions_file)
+    return processor.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_VIDEO_URL) else 1)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import os
+import json
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+DIFFICULTIES = ("Easy", "Medium", "Hard", "Intense")
+OPTION_LETTERS = ("A", "B", "C", "D")
+
+
+class Question:
+    """One multiple-choice question, validated when it is created."""
+
+    __slots__ = ("difficulty", "question", "options", "correct_answer", "explanation", "chapter")
+
+    def __init__(self, difficulty: str, question: str, options: Tuple[str, str, str, str],
+                 correct_answer: str, explanation: str, chapter: Optional[str] = None):
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Invalid difficulty {difficulty!r}, expected one of {', '.join(DIFFICULTIES)}")
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("Question text must be a non-empty string")
+        options = tuple(options)
+        if len(options) != len(OPTION_LETTERS) or not all(isinstance(o, str) and o.strip() for o in options):
+            raise ValueError(f"Expected {len(OPTION_LETTERS)} non-empty options (A-D) for: {question}")
+        if correct_answer not in OPTION_LETTERS:
+            raise ValueError(f"Invalid correct_answer {correct_answer!r}, expected one of A-D")
+        if not isinstance(explanation, str) or not explanation.strip():
+            raise ValueError(f"Missing explanation for: {question}")
+
+        self.difficulty = difficulty
+        self.question = question
+        self.options = options
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+        self.chapter = chapter
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Question":
+        """Build a question from the JSON shape Claude returns."""
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a question object, got {type(data).__name__}: {data!r}")
+        options = data.get("options")
+        if not isinstance(options, dict) or set(options) != set(OPTION_LETTERS):
+            raise ValueError(f"Options must have exactly the keys A-D, got {options!r}")
+        answer = data.get("correct_answer")
+        return cls(
+            difficulty=data.get("difficulty"),
+            question=data.get("question"),
+            options=tuple(options[letter] for letter in OPTION_LETTERS),
+            correct_answer=answer.strip().upper() if isinstance(answer, str) else answer,
+            explanation=data.get("explanation"),
+            chapter=data.get("chapter"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "difficulty": self.difficulty,
+            "question": self.question,
+            "options": dict(zip(OPTION_LETTERS, self.options)),
+            "correct_answer": self.correct_answer,
+            "explanation": self.explanation,
+        }
+        if self.chapter is not None:
+            data["chapter"] = self.chapter
+        return data
+
+    def option_items(self) -> Iterator[Tuple[str, str]]:
+        """Yield (letter, text) pairs in A-D order."""
+        return zip(OPTION_LETTERS, self.options)
+
+    def option(self, letter: str) -> str:
+        return self.options[OPTION_LETTERS.index(letter)]
+
+    @property
+    def correct_option(self) -> str:
+        return self.option(self.correct_answer)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Question):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Question({self.difficulty!r}, {self.question!r}, chapter={self.chapter!r})"
+
+
+def iter_questions(path: str, metrics=None) -> Iterator[Question]:
+    """Stream questions from a JSON Lines bank, one record at a time.
+
+    Malformed records are skipped and counted as questions_rejected (when
+    metrics is given), so one bad line never aborts a whole run. Legacy
+    ``.json`` files holding a single array are still accepted, but have to
+    be loaded whole.
+    """
+    with open(path, 'r') as f:
+        if path.endswith(".json"):
+            records = enumerate(json.load(f), 1)
+        else:
+            records = ((line_number, line.strip()) for line_number, line in enumerate(f, 1))
+
+        for position, record in records:
+            if record == "":
+                continue
+            try:
+                yield Question.from_dict(json.loads(record) if isinstance(record, str) else record)
+            except ValueError as e:  # includes json.JSONDecodeError
+                print(f"⚠️ Skipping invalid question at {path}:{position}: {e}")
+                if metrics is not None:
+                    metrics.increment("questions_rejected")
+
+
+def write_questions(path: str, questions: Iterable[Question]) -> int:
+    """Write questions as JSON Lines, replacing the file atomically. Returns the count."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, 'w') as f:
+        for question in questions:
+            f.write(json.dumps(question.to_dict()) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def append_questions(path: str, questions: Iterable[Question]) -> int:
+    """Append questions to a multi-run JSON Lines bank. Returns the count."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(path, 'a') as f:
+        for question in questions:
+            f.write(json.dumps(question.to_dict()) + "\n")
+            count += 1
+    return count
@@ -1,107 +1,322 @@
-import fitz
-import anthropic
 import os
 import json
+import sys
+import time
 import asyncio
-import aiohttp
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from pipeline_metrics import PipelineMetrics
+from question_bank import Question, write_questions
 
 class CSCSTrivia:
-    def __init__(self):
+    MODEL = "claude-3-5-sonnet-20241022"
+    SYSTEM_PROMPT = "You are a CSCS expert creating accurate multiple choice questions. Always return responses in valid JSON format."
+    QUESTION_INSTRUCTIONS = """Return the questions in this exact JSON format:
+{
+    "questions": [
+        {
+            "difficulty": "Easy/Medium/Hard/Intense",
+            "question": "The question text",
+            "options": {
+                "A": "First option",
+                "B": "Second option",
+                "C": "Third option",
+                "D": "Fourth option"
+            },
+            "correct_answer": "A/B/C/D",
+            "explanation": "Why this answer is correct"
+        }
+    ]
+}"""
+    DEFAULT_DIFFICULTY_COUNTS = {"Easy": 2, "Medium": 2, "Hard": 2, "Intense": 1}
+
+    def __init__(self, metrics: Optional[PipelineMetrics] = None, client=None):
         load_dotenv()
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
-        self.client = anthropic.Anthropic(api_key=self.anthropic_api_key)
+        if client is None:
+            import anthropic
+            client = anthropic.Anthropic(api_key=self.anthropic_api_key)
+        self.client = client
+        self.metrics = metrics or PipelineMetrics()
         
     async def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract and clean text from PDF."""
+        import fitz
+
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text("text") + "\n\n"
+            with self.metrics.span("pdf_extract", pdf=os.path.basename(pdf_path)) as span:
+                doc = fitz.open(pdf_path)
+                text = ""
+                for page in doc:
+                    text += page.get_text("text") + "\n\n"
+                span["pages"] = len(doc)
             return text.strip()
         except Exception as e:
             raise Exception(f"Error extracting PDF text: {str(e)}")
 
-    async def generate_questions(self, chapter_text: str, chapter_name: str, 
-                               num_questions: int = 7) -> List[Dict[str, Any]]:
-        """Generate questions using Claude with improved JSON output."""
-        prompt = f"""
-        Based on this CSCS textbook content from {chapter_name}, create {num_questions} multiple-choice questions.
-        Distribute the questions across these difficulty levels:
-        - 2 Easy
-        - 2 Medium
-        - 2 Hard
-        - 1 Intense
-
-        Return the questions in this exact JSON format:
-        {{
-            "questions": [
-                {{
-                    "difficulty": "Easy/Medium/Hard/Intense",
-                    "question": "The question text",
-                    "options": {{
-                        "A": "First option",
-                        "B": "Second option",
-                        "C": "Third option",
-                        "D": "Fourth option"
-                    }},
-                    "correct_answer": "A/B/C/D",
-                    "explanation": "Why this answer is correct"
-                }}
-            ]
-        }}
-
-        Textbook Content:
-        {chapter_text}
-        """
+    def build_question_content(self, chapter_text: str, chapter_name: str,
+                               num_questions: int = 7,
+                               difficulty_counts: Optional[Dict[str, int]] = None,
+                               avoid_questions: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Build the user turn as a cacheable chapter prefix plus a small per-request suffix."""
+        difficulty_counts = difficulty_counts or self.DEFAULT_DIFFICULTY_COUNTS
+        distribution = "\n".join(f"- {count} {level}" for level, count in difficulty_counts.items())
+        request_text = (
+            f"Based on the CSCS textbook content above from {chapter_name}, "
+            f"create {num_questions} multiple-choice questions.\n"
+            f"Distribute the questions across these difficulty levels:\n{distribution}"
+        )
+        if avoid_questions:
+            request_text += "\n\nDo not repeat or paraphrase these existing questions:\n"
+            request_text += "\n".join(f"- {q}" for q in avoid_questions)
 
+        return [
+            {
+                "type": "text",
+                "text": f"Textbook Content from {chapter_name}:\n{chapter_text}",
+                # Everything up to and including the chapter text is reused across requests
+                "cache_control": {"type": "ephemeral"},
+            },
+            {"type": "text", "text": request_text},
+        ]
+
+    def parse_questions_response(self, response) -> List[Question]:
+        """Parse and validate the questions list out of a Claude message."""
         try:
-            response = await self._make_claude_request(prompt)
-            # Parse JSON from Claude's response
             questions_data = json.loads(response.content[0].text)
-            return questions_data["questions"]
         except json.JSONDecodeError:
             raise Exception("Failed to parse Claude's response as JSON")
+        if not isinstance(questions_data, dict) or not isinstance(questions_data.get("questions"), list):
+            raise Exception("Failed to parse Claude's response as JSON: expected a \"questions\" list")
+
+        questions = []
+        for data in questions_data["questions"]:
+            try:
+                questions.append(Question.from_dict(data))
+            except ValueError as e:
+                print(f"⚠️ Skipping invalid question: {e}")
+                self.metrics.increment("questions_rejected")
+        return questions
+
+    async def generate_questions(self, chapter_text: str, chapter_name: str, 
+                               num_questions: int = 7,
+                               difficulty_counts: Optional[Dict[str, int]] = None,
+                               avoid_questions: Optional[List[str]] = None) -> List[Question]:
+        """Generate questions using Claude with improved JSON output.
+
+        Pass difficulty_counts (e.g. {"Hard": 2}) to regenerate a single tier, and
+        avoid_questions to request an extra set; both only change the uncached suffix.
+        """
+        if difficulty_counts:
+            num_questions = sum(difficulty_counts.values())
+        content = self.build_question_content(
+            chapter_text, chapter_name, num_questions, difficulty_counts, avoid_questions
+        )
+
+        try:
+            response = await self._make_claude_request(content)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+                cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+                print(f"💾 Prompt cache: {cache_read} tokens read, {cache_write} tokens written")
+            return self.parse_questions_response(response)
         except Exception as e:
             raise Exception(f"Error generating questions: {str(e)}")
 
-    async def _make_claude_request(self, prompt: str):
+    def _message_params(self, content, system: Optional[str] = None,
+                        temperature: float = 0.7) -> Dict[str, Any]:
+        """Request parameters shared by synchronous and batch submissions."""
+        if system is None:
+            # Stable across every chapter, so it sits at the front of the cached prefix
+            system = f"{self.SYSTEM_PROMPT}\n\n{self.QUESTION_INSTRUCTIONS}"
+        return {
+            "model": self.MODEL,
+            "max_tokens": 2000,
+            "temperature": temperature,
+            "system": [{"type": "text", "text": system}],
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    async def _make_claude_request(self, content, **params):
         """Make request to Claude with retry logic."""
         max_retries = 3
+        model = self.MODEL
         for attempt in range(max_retries):
             try:
-                return await asyncio.to_thread(
-                    self.client.messages.create,
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=2000,
-                    temperature=0.7,
-                    system="You are a CSCS expert creating accurate multiple choice questions. Always return responses in valid JSON format.",
-                    messages=[{"role": "user", "content": prompt}]
-                )
+                with self.metrics.span("claude_request", model=model, attempt=attempt + 1):
+                    response = await asyncio.to_thread(
+                        self.client.messages.create,
+                        **self._message_params(content, **params)
+                    )
+                self._record_usage(response, model)
+                return response
             except Exception as e:
+                self.metrics.increment("claude_errors", model=model)
                 if attempt == max_retries - 1:
                     raise
+                self.metrics.increment("claude_retries", model=model)
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
 
-    async def process_chapter(self, chapter_path: str) -> List[Dict[str, Any]]:
+    def _record_usage(self, response, model: str):
+        """Record request count and token usage reported by the API."""
+        self.metrics.increment("claude_requests", model=model)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.metrics.increment("claude_input_tokens", usage.input_tokens, model=model)
+        self.metrics.increment("claude_output_tokens", usage.output_tokens, model=model)
+        self.metrics.increment("claude_cache_read_input_tokens",
+                               getattr(usage, "cache_read_input_tokens", None) or 0, model=model)
+        self.metrics.increment("claude_cache_creation_input_tokens",
+                               getattr(usage, "cache_creation_input_tokens", None) or 0, model=model)
+
+    @staticmethod
+    def chapter_name_from_path(chapter_path: str) -> str:
+        return os.path.basename(chapter_path).replace(".pdf","").replace("_", " ")
+
+    def client_kind(self) -> str:
+        """Which client a batch id belongs to; ids from one never resolve on another."""
+        return f"{type(self.client).__module__}.{type(self.client).__name__}"
+
+    @staticmethod
+    def _load_batch_state(state_file: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(state_file):
+            return None
+        with open(state_file, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save_batch_state(state_file: str, state: Dict[str, Any]):
+        # Write-then-rename so a crash mid-write never leaves a corrupt state file
+        tmp_file = state_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, state_file)
+
+    async def submit_batch(self, chapter_paths: List[str], state_file: str) -> Dict[str, Any]:
+        """Submit every chapter prompt as one Message Batch and persist its id."""
+        requests = []
+        chapters = {}
+        for chapter_path in chapter_paths:
+            chapter_name = self.chapter_name_from_path(chapter_path)
+            text = await self.extract_text_from_pdf(chapter_path)
+            if not text.strip():
+                print(f"⚠️ No text extracted from {chapter_path}, skipping")
+                continue
+            custom_id = os.path.basename(chapter_path).replace(".pdf", "")
+            chapters[custom_id] = chapter_name
+            requests.append({
+                "custom_id": custom_id,
+                "params": self._message_params(self.build_question_content(text, chapter_name)),
+            })
+
+        if not requests:
+            raise Exception("No chapter prompts to submit")
+
+        with self.metrics.span("claude_batch_submit", requests=len(requests)):
+            batch = await asyncio.to_thread(self.client.messages.batches.create, requests=requests)
+        self.metrics.increment("claude_batch_requests", len(requests), model=self.MODEL)
+
+        state = {
+            "batch_id": batch.id,
+            "client": self.client_kind(),
+            "status": batch.processing_status,
+            "chapters": chapters,
+            "submitted_at": time.time(),
+        }
+        self._save_batch_state(state_file, state)
+        print(f"✅ Submitted batch {batch.id} with {len(requests)} chapters")
+        return state
+
+    async def wait_for_batch(self, state: Dict[str, Any], state_file: str,
+                             poll_interval: float = 60.0):
+        """Poll a submitted batch until processing has ended."""
+        with self.metrics.span("claude_batch_wait", batch_id=state["batch_id"]):
+            while True:
+                batch = await asyncio.to_thread(self.client.messages.batches.retrieve, state["batch_id"])
+                if batch.processing_status != state["status"]:
+                    state["status"] = batch.processing_status
+                    self._save_batch_state(state_file, state)
+                if batch.processing_status == "ended":
+                    return batch
+                counts = batch.request_counts
+                print(f"⏳ Batch {batch.id}: {counts.processing} processing, {counts.succeeded} succeeded, {counts.errored} errored")
+                await asyncio.sleep(poll_interval)
+
+    async def collect_batch_results(self, state: Dict[str, Any]) -> List[Question]:
+        """Parse batch results through the same path as generate_questions."""
+        entries = await asyncio.to_thread(lambda: list(self.client.messages.batches.results(state["batch_id"])))
+        results_by_id = {entry.custom_id: entry for entry in entries}
+
+        all_questions = []
+        # Keep submission order; batch results are not returned in order
+        for custom_id, chapter_name in state["chapters"].items():
+            entry = results_by_id.get(custom_id)
+            if entry is None or entry.result.type != "succeeded":
+                reason = entry.result.type if entry else "missing"
+                print(f"❌ Batch request for {chapter_name} {reason}")
+                self.metrics.increment("claude_errors", model=self.MODEL)
+                continue
+            self._record_usage(entry.result.message, self.MODEL)
+            try:
+                questions = self.parse_questions_response(entry.result.message)
+            except Exception as e:
+                print(f"❌ Error processing {chapter_name}: {str(e)}")
+                continue
+            for q in questions:
+                q.chapter = chapter_name
+            print(f"✅ {chapter_name}: {len(questions)} questions")
+            self.metrics.increment("questions_generated", len(questions))
+            all_questions.extend(questions)
+        return all_questions
+
+    async def process_book_batch(self, chapter_paths: List[str],
+                                 state_file: str = "batch_state.json",
+                                 poll_interval: float = 60.0) -> List[Question]:
+        """Generate questions for many chapters via one batch, resuming a saved job if present."""
+        state = self._load_batch_state(state_file)
+        if state and state.get("client", self.client_kind()) != self.client_kind():
+            print(f"⚠️ Batch {state['batch_id']} was submitted with {state['client']}; submitting a new one")
+            state = None
+        if state:
+            print(f"\n🔁 Resuming batch {state['batch_id']} ({len(state['chapters'])} chapters)")
+            try:
+                await self.wait_for_batch(state, state_file, poll_interval)
+            except Exception as e:
+                # An unknown or malformed id will never resolve; retrying it would fail every run
+                if getattr(e, "status_code", None) not in (400, 404):
+                    raise
+                print(f"⚠️ Batch {state['batch_id']} cannot be retrieved ({str(e)}); submitting a new one")
+                state = None
+            else:
+                return await self.collect_batch_results(state)
+
+        print(f"\n📦 Submitting {len(chapter_paths)} chapters as a batch...")
+        state = await self.submit_batch(chapter_paths, state_file)
+        await self.wait_for_batch(state, state_file, poll_interval)
+        return await self.collect_batch_results(state)
+
+    async def process_chapter(self, chapter_path: str) -> List[Question]:
         """Process a single chapter with error handling."""
         try:
-            chapter_name = os.path.basename(chapter_path).replace(".pdf","").replace("_", " ")
+            chapter_name = self.chapter_name_from_path(chapter_path)
             print(f"\n📚 Processing {chapter_name}...")
             
-            text = await self.extract_text_from_pdf(chapter_path)
-            if not text.strip():
-                raise Exception("No text extracted from PDF")
-                
-            print(f"✅ Extracted {len(text.split())} words")
-            questions = await self.generate_questions(text, chapter_name)
-            print(f"✅ Generated {len(questions)} questions")
+            with self.metrics.span("process_chapter", chapter=chapter_name) as span:
+                text = await self.extract_text_from_pdf(chapter_path)
+                if not text.strip():
+                    raise Exception("No text extracted from PDF")
+                    
+                print(f"✅ Extracted {len(text.split())} words")
+                questions = await self.generate_questions(text, chapter_name)
+                print(f"✅ Generated {len(questions)} questions")
+                span["questions"] = len(questions)
+            self.metrics.increment("questions_generated", len(questions))
             
             # Add chapter info to each question
             for q in questions:
-                q["chapter"] = chapter_name
+                q.chapter = chapter_name
                 
             return questions
             
@@ -109,36 +324,89 @@ class CSCSTrivia:
             print(f"❌ Error processing {chapter_path}: {str(e)}")
             return []
 
-async def main():
+async def main(output_file: str = "chapter1_questions.jsonl", use_local: bool = False) -> bool:
+    """Generate chapter 1 questions. Returns True if any questions were saved."""
     try:
-        trivia = CSCSTrivia()
+        client = None
+        if use_local:
+            from local_batch_api import LocalAnthropicClient
+            client = LocalAnthropicClient()
+        trivia = CSCSTrivia(client=client)
         
         # Start with Chapter 1
         chapter_path = "chapters/chapter_1.pdf"
         questions = await trivia.process_chapter(chapter_path)
         
         if questions:
-            # Save questions to JSON
-            output_file = "chapter1_questions.json"
-            with open(output_file, 'w') as f:
-                json.dump(questions, f, indent=2)
+            # Save questions as JSON Lines
+            write_questions(output_file, questions)
             print(f"\n✅ Saved {len(questions)} questions to {output_file}")
             
             # Print sample question
             print("\n📝 Sample Question:")
             sample = questions[0]
-            print(f"Difficulty: {sample['difficulty']}")
-            print(f"Question: {sample['question']}")
+            print(f"Difficulty: {sample.difficulty}")
+            print(f"Question: {sample.question}")
             print("Options:")
-            for letter, option in sample['options'].items():
+            for letter, option in sample.option_items():
                 print(f"{letter}) {option}")
-            print(f"Correct Answer: {sample['correct_answer']}")
-            print(f"Explanation: {sample['explanation']}")
+            print(f"Correct Answer: {sample.correct_answer}")
+            print(f"Explanation: {sample.explanation}")
         else:
             print("\n❌ No questions were generated")
+
+        trivia.metrics.print_summary()
+        trivia.metrics.export_jsonl("metrics/trivia_metrics.jsonl")
+        trivia.metrics.export_prometheus("metrics/trivia.prom", stage="trivia")
+        return bool(questions)
             
     except Exception as e:
         print(f"\n❌ Critical error: {str(e)}")
+        return False
+
+async def batch_main(use_local: bool = False,
+                     output_file: str = "all_chapters_questions.jsonl") -> bool:
+    """Nightly whole-book regeneration through the Message Batches API. Returns True if any questions were saved."""
+    try:
+        client = None
+        if use_local:
+            from local_batch_api import LocalAnthropicClient
+            client = LocalAnthropicClient()
+        trivia = CSCSTrivia(client=client)
+
+        chapter_paths = sorted(
+            (os.path.join("chapters", f) for f in os.listdir("chapters")
+             if f.startswith("chapter_") and f.endswith(".pdf")),
+            key=lambda p: int(os.path.basename(p)[len("chapter_"):-len(".pdf")])
+        )
+        # Local and Anthropic batch ids are not interchangeable, so each client keeps its own state
+        state_file = "local_batch_state.json" if use_local else "batch_state.json"
+        questions = await trivia.process_book_batch(
+            chapter_paths, state_file, poll_interval=1.0 if use_local else 60.0
+        )
+
+        if questions:
+            write_questions(output_file, questions)
+            print(f"\n✅ Saved {len(questions)} questions to {output_file}")
+        else:
+            print("\n❌ No questions were generated")
+
+        # The batch has ended (even if every request errored or expired), so
+        # the next run must submit a fresh batch rather than resume this one
+        os.remove(state_file)
+
+        trivia.metrics.print_summary()
+        trivia.metrics.export_jsonl("metrics/trivia_batch_metrics.jsonl")
+        trivia.metrics.export_prometheus("metrics/trivia_batch.prom", stage="trivia_batch")
+        return bool(questions)
+
+    except Exception as e:
+        print(f"\n❌ Critical error: {str(e)}")
+        return False
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if "--batch" in sys.argv[1:]:
+        succeeded = asyncio.run(batch_main(use_local="--local" in sys.argv[1:]))
+    else:
+        succeeded = asyncio.run(main(use_local="--local" in sys.argv[1:]))
+    sys.exit(0 if succeeded else 1)
\ No newline at end of file